@@ -7,7 +7,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import threading
-from PIL import Image, ImageTk, ImageSequence
+from PIL import Image, ImageTk
 import pygame
 import os
 import subprocess
@@ -15,8 +15,20 @@ import sys
 import matplotlib.colors as mcolors
 import random
 import json
+import math
+from types import SimpleNamespace
+from data_log import DATA_FILE, time_in_hours
+from group_stats import GroupIndex, split_group_key
+from heatmap_stats import HeatmapCache, METRICS, WEEKDAYS
+from asset_manager import AssetManager
+from settings_schema import validate_settings
+from settings_watcher import SettingsWatcher
 
-VERSION = "2.2.2"
+VERSION = "2.8.0"
+
+def log_error(error="Error"):
+    with open("error_log.txt", "a") as error_file:
+        error_file.write(f"{datetime.datetime.now()} - Error: {str(error)}\n")
 
 # ==== Import settings from JSON ====
 SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "settings.json")
@@ -26,119 +38,69 @@ def load_settings():
             return json.load(f)
     except Exception as e:
         log_error(f"Failed to load settings: {e}")
-        return {}
-    
-settings = load_settings()
+        return None
+
+def validated(loaded, resolve_color=None):
+    values, errors = validate_settings(loaded, resolve_color)
+    for error in errors:
+        log_error(error)
+    return values
+
+settings = load_settings() or {}
 at_latest = None
-    
+
+# ==== Assign values ====
+# One attribute per entry in SETTINGS_SCHEMA (settings_schema.py), e.g.
+# cfg.frame_color, cfg.plot_colors_list, cfg.grid_enabled, cfg.legend_ncol...
+cfg = SimpleNamespace(**validated(settings))
+
 # ==== Assign sound folder ====
 SOUND_FOLDER = os.path.join(os.path.dirname(__file__), "sounds")
-MUSIC_FOLDER = os.path.join(os.path.dirname(__file__), settings.get("music_folder", "sounds/music"))
+MUSIC_FOLDER = os.path.join(os.path.dirname(__file__), cfg.music_folder)
 
-# ==== Assign values ====
-test_button_text_color = settings.get("test_button_text_color", "#1debb7")
-test_button_background_color = settings.get("test_button_background_color", "#0d1f3b")
-test_button_click_color = settings.get("test_button_click_color", "#0d1f3b")
-
-plot_button_text_color = settings.get("plot_button_text_color", "#1debb7")
-plot_button_background_color = settings.get("plot_button_background_color", "#0d1f3b")
-plot_button_click_color = settings.get("plot_button_click_color", "#0d1f3b")
-
-action_button_background_color = settings.get("action_button_background_color", "#0d1f3b")
-action_button_text_color = settings.get("action_button_text_color", "#1debb7")
-
-action_button_click_color = settings.get("action_button_click_color", "#2563eb")
-auto_test_text_color = settings.get("auto_test_text_color", "white")
-sound_text_color = settings.get("sound_text_color", "white")
-music_test_text_color = settings.get("music_test_text_color", "white")
-
-plot_colors_list = settings.get("plot_colors_list", ['red', 'orange', 'yellow', 'green', 'blue', 'violet'])
-valid_colors = list(mcolors.CSS4_COLORS.keys())
-plot_colors_list = [c for c in settings.get("plot_colors_list", ['red', 'orange', 'yellow', 'green', 'blue', 'violet']) if c in valid_colors]
-
-plot_background_color = settings.get("plot_background_color", "white")
-plot_text_color = settings.get("plot_text_color", "black")
-plot_border_color = settings.get("plot_border_color", "black")
-
-if not plot_colors_list:
-    # Fallback in case user provides an empty or invalid list
-    plot_colors_list = ['red', 'orange', 'yellow', 'green', 'blue', 'violet']
-
-grid_settings = settings.get("grid", {})
-grid_enabled = grid_settings.get("enabled", True)
-grid_color = grid_settings.get("color", "gray")
-grid_linestyle = grid_settings.get("linestyle", "--")
-grid_linewidth = grid_settings.get("linewidth", 0.5)
-
-scatter_settings = settings.get("scatter", {})
-edge_color = scatter_settings.get("edge_color", "white")
-linewidth = scatter_settings.get("linewidth", 1.5)
-marker = scatter_settings.get("marker", "o")
-size = scatter_settings.get("size", 40)
-avg_lines_settings = settings.get("average_lines", {})
-
-# Code on rows: 213-231 Unmoveable (ish) settings
-
-colorbar_settings = settings.get("colorbar", {})
-cbar_label = colorbar_settings.get("label", "Speed (Mbps)")
-cbar_text_color = colorbar_settings.get("plot_text_color", "black")
-
-legend_settings = settings.get("legend", {})
-legend_enabled = legend_settings.get("enabled", True)
-legend_text_color = legend_settings.get("text_color", "white")
-legend_background_color = legend_settings.get("legend_background_color")
-legend_ncol = legend_settings.get("ncol", 2)
-legend_frameon = legend_settings.get("frameon", False)
-legend_border_color = legend_settings.get("legend_border_color", "#000000")
-
-sound_active_color = settings.get("sound_active_color", "#007000")
-sound_inactive_color = settings.get("sound_inactive_color", "#8F000A")
-
-music_active_color = settings.get("music_active_color", "#007000")
-music_inactive_color = settings.get("music_inactive_color", "#8F000A")
-
-autotest_active_color = settings.get("autotest_active_color", "#007000")
-autotest_inactive_color = settings.get("autotest_inactive_color", "#8F000A")
-
-interval_text_color = settings.get("interval_text_color", "black")
-interval_background_color = settings.get("interval_background_color", "grey")
-
-# ==== Initialize Pygame Mixer ====
-pygame.mixer.init()
-loaded_sounds = {}
-
-# Load sounds into loaded_sounds[]
-def load_sound(filename):
-    full_path = os.path.join(SOUND_FOLDER, filename)
-    if os.path.exists(full_path):
-        loaded_sounds[filename] = pygame.mixer.Sound(full_path)
-    else:
-        loaded_sounds[filename] = None
+# ==== History shown in stats and plots ====
+# New results are always written to DATA_FILE. Point "history_file" at
+# fleet_data.txt (see fleet_merge.py) to plot the merged history of all probes.
+HISTORY_FILE = cfg.history_file
 
-for sound_file in ["testing.wav", "plot.wav", "auto_on.wav", "auto_off.wav", "interval.wav", "error.wav"]:
-    load_sound(sound_file)
+# Colormap used by the plots, rebuilt only when plot_colors_list changes
+speed_cmap = mcolors.LinearSegmentedColormap.from_list("speed_cmap", cfg.plot_colors_list)
 
+# ==== Sounds, images and music (loaded on first use) ====
+assets = AssetManager(SOUND_FOLDER, MUSIC_FOLDER)
 
-# Load testing sound
-testing_sound_path = os.path.join(SOUND_FOLDER, "testing.wav")
+# Looping testing sound while a test runs, kept so it can be stopped
 testing_sound = None
-if os.path.exists(testing_sound_path):
-    testing_sound = pygame.mixer.Sound(testing_sound_path)
 
 # Sound enabled flag
 sound_enabled = True
 
+# ==== Grouped analytics and weekday x hour heatmap (loaded on first use) ====
+# Built on the first test or plot, not at startup, and dropped when
+# history_file changes
+group_index = None
+heatmap_cache = None
+stats_lock = threading.Lock()
+
+def get_group_index():
+    global group_index
+    with stats_lock:
+        if group_index is None:
+            group_index = GroupIndex(HISTORY_FILE)
+        return group_index
+
+def get_heatmap_cache():
+    global heatmap_cache
+    with stats_lock:
+        if heatmap_cache is None:
+            heatmap_cache = HeatmapCache(HISTORY_FILE)
+        return heatmap_cache
+
 
 def play_sound(filename):
     if not sound_enabled:
         return
-    sound = loaded_sounds.get(filename)
-    if sound:
-        sound.play()
-
-def log_error(error="Error"):
-    with open("error_log.txt", "a") as error_file:
-        error_file.write(f"{datetime.datetime.now()} - Error: {str(error)}\n")
+    assets.play(filename)
 
 def collect_data():
     try:
@@ -161,7 +123,7 @@ def collect_data():
         speed_upload = round(speed_upload, 3)
 
         data = [user_date, user_time, speed_download, speed_upload, ping, isp, country, lat, lon]
-        with open("internet_data.txt", "a") as file:
+        with open(DATA_FILE, "a") as file:
             file.write(",".join(map(str, data)) + "\n")
         return data
     except Exception as e:
@@ -181,15 +143,27 @@ def open_image(path):
         log_error(f"Failed to open image: {e}")
 
 
+def style_axes(fig, ax):
+    ax.tick_params(colors=cfg.plot_text_color)
+    for spine in ax.spines.values():
+        spine.set_color(cfg.plot_border_color)
+    if cfg.grid_enabled:
+        ax.grid(True, color=cfg.grid_color, linestyle=cfg.grid_linestyle, linewidth=cfg.grid_linewidth)
+    else:
+        ax.grid(False)
+    fig.patch.set_facecolor(cfg.plot_background_color)
+    ax.set_facecolor(cfg.plot_background_color)
+
+
 def save_scatter_plot():
     try:
-        if not os.path.exists('internet_data.txt'):
+        if not os.path.exists(HISTORY_FILE):
             play_sound("error.wav")
             #messagebox.showinfo("Info", "Please run a speed test first.")
             return
         else:
             play_sound("plot.wav")
-            data = pd.read_csv('internet_data.txt', header=None)
+            data = pd.read_csv(HISTORY_FILE, header=None)
             if data.shape[1] < 4:
                 raise ValueError("Data file does not have the required columns.")
             times = data[1]
@@ -202,32 +176,18 @@ def save_scatter_plot():
             max_speed = all_speeds.max()
 
 
-            cmap = mcolors.LinearSegmentedColormap.from_list("speed_cmap", plot_colors_list)
+            cmap = speed_cmap
             norm = mcolors.Normalize(vmin=min_speed, vmax=max_speed)
 
             fig, ax = plt.subplots(figsize=(10, 6))
 
             # Titles and labels
-            ax.set_title("Scatter Plot", color=plot_text_color)
-            ax.set_xlabel("X", color=plot_text_color)
-            ax.set_ylabel("Y", color=plot_text_color)
-
-            # Ticks
-            ax.tick_params(colors=plot_text_color)
-
-            # Spines
-            for spine in ax.spines.values():
-                spine.set_color(plot_border_color)
-
-
-
-            if grid_enabled:
-                ax.grid(True, color=grid_color, linestyle=grid_linestyle, linewidth=grid_linewidth)
-            else:
-                ax.grid(False)
+            ax.set_title("Scatter Plot", color=cfg.plot_text_color)
+            ax.set_xlabel("X", color=cfg.plot_text_color)
+            ax.set_ylabel("Y", color=cfg.plot_text_color)
 
-            fig.patch.set_facecolor(plot_background_color)
-            ax.set_facecolor(plot_background_color)
+            # Ticks, spines, grid and background
+            style_axes(fig, ax)
 
 
             dl_colors = cmap(norm(download_speeds))
@@ -238,18 +198,18 @@ def save_scatter_plot():
 
             ax.scatter(times_in_hours[-1], download_speeds.iloc[-1], 
                     color=dl_colors[-1], label='Latest Download', 
-                    s=size, edgecolor=edge_color, linewidth=linewidth, marker=marker)
+                    s=cfg.size, edgecolor=cfg.edge_color, linewidth=cfg.linewidth, marker=cfg.marker)
 
             ax.scatter(times_in_hours[-1], upload_speeds.iloc[-1], 
                     color=ul_colors[-1], label='Latest Upload', 
-                    s=size, edgecolor=edge_color, linewidth=linewidth, marker=marker)
+                    s=cfg.size, edgecolor=cfg.edge_color, linewidth=cfg.linewidth, marker=cfg.marker)
 
-            if avg_lines_settings.get("enabled", True):
+            if cfg.avg_lines_settings.get("enabled", True):
                 avg_dl = download_speeds.mean()
                 avg_ul = upload_speeds.mean()
 
-                dl_settings = avg_lines_settings.get("download", {})
-                ul_settings = avg_lines_settings.get("upload", {})
+                dl_settings = cfg.avg_lines_settings.get("download", {})
+                ul_settings = cfg.avg_lines_settings.get("upload", {})
 
                 ax.axhline(avg_dl,
                         color=dl_settings.get("color", "blue"),
@@ -272,25 +232,25 @@ def save_scatter_plot():
             sm = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
             sm.set_array([])
             cbar = plt.colorbar(sm, ax=ax)
-            cbar.set_label(cbar_label, color=cbar_text_color)
+            cbar.set_label(cfg.cbar_label, color=cfg.cbar_text_color)
 
             # Optionally apply color to tick labels too:
-            cbar.ax.yaxis.set_tick_params(color=cbar_text_color)
+            cbar.ax.yaxis.set_tick_params(color=cfg.cbar_text_color)
             for tick_label in cbar.ax.get_yticklabels():
-                tick_label.set_color(cbar_text_color)
+                tick_label.set_color(cfg.cbar_text_color)
 
-            if legend_enabled:
+            if cfg.legend_enabled:
                 legend = ax.legend(
                     loc='upper center',
                     bbox_to_anchor=(0.5, -0.15),
-                    ncol=legend_ncol,
-                    frameon=legend_frameon
+                    ncol=cfg.legend_ncol,
+                    frameon=cfg.legend_frameon
                 )
-                legend.get_frame().set_facecolor(legend_background_color)
-                legend.get_frame().set_edgecolor(legend_border_color)
+                legend.get_frame().set_facecolor(cfg.legend_background_color)
+                legend.get_frame().set_edgecolor(cfg.legend_border_color)
                 #legend.get_frame().set_facecolor(legend_background_color, "#22223b")  # <-- Add this line
                 for text in legend.get_texts():
-                    text.set_color(legend_text_color)
+                    text.set_color(cfg.legend_text_color)
             else:
                 ax.get_legend().remove()  # Safely remove existing legend
 
@@ -306,6 +266,122 @@ def save_scatter_plot():
         log_error(e)
 
 
+def save_group_plot():
+    # One small chart per ISP / location group. The averages come from the
+    # index, but every point is read through its row offset (one seek per row),
+    # so this still reads every indexed row of the history.
+    try:
+        group_index = get_group_index()
+        group_index.update()
+        summaries = group_index.summaries()
+        if not summaries:
+            play_sound("error.wav")
+            return
+        play_sound("plot.wav")
+
+        cols = min(3, len(summaries))
+        rows = math.ceil(len(summaries) / cols)
+        fig, axes = plt.subplots(rows, cols, figsize=(5 * cols, 3.5 * rows), squeeze=False, sharey=True)
+
+        max_speed = max(max(s["max_download"], s["max_upload"]) for _, s in summaries)
+        min_speed = min(min(s["min_download"], s["min_upload"]) for _, s in summaries)
+        cmap = speed_cmap
+        norm = mcolors.Normalize(vmin=min_speed, vmax=max_speed)
+
+        dl_settings = cfg.avg_lines_settings.get("download", {})
+        ul_settings = cfg.avg_lines_settings.get("upload", {})
+
+        for ax, (key, summary) in zip(axes.flat, summaries):
+            group_rows = group_index.rows(key)
+            hours = [time_in_hours(row["time"]) for row in group_rows]
+            download_speeds = [row["download"] for row in group_rows]
+            upload_speeds = [row["upload"] for row in group_rows]
+
+            style_axes(fig, ax)
+            ax.scatter(hours, download_speeds, color=cmap(norm(download_speeds)), label='Download', s=20, edgecolor='k', linewidth=0.3)
+            ax.scatter(hours, upload_speeds, color=cmap(norm(upload_speeds)), label='Upload', s=20, edgecolor='k', linewidth=0.3, marker='^')
+
+            if cfg.avg_lines_settings.get("enabled", True):
+                ax.axhline(summary["avg_download"],
+                        color=dl_settings.get("color", "blue"),
+                        linestyle=dl_settings.get("linestyle", "--"),
+                        linewidth=dl_settings.get("linewidth", 1.2))
+                ax.axhline(summary["avg_upload"],
+                        color=ul_settings.get("color", "red"),
+                        linestyle=ul_settings.get("linestyle", "--"),
+                        linewidth=ul_settings.get("linewidth", 1.2))
+
+            isp, country, lat, lon = split_group_key(key)
+            ax.set_title(f"{isp} | {country} | {lat}, {lon}\n"
+                         f"{summary['count']} tests | Avg D/U: {round(summary['avg_download'], 2)} / {round(summary['avg_upload'], 2)}",
+                         color=cfg.plot_text_color, fontsize=9)
+            ax.set_xlim([0, 24])
+            ax.set_xticks(np.arange(0, 25, 4))
+
+        # Hide unused cells
+        for ax in list(axes.flat)[len(summaries):]:
+            ax.set_visible(False)
+
+        fig.supxlabel('Hour', color=cfg.plot_text_color)
+        fig.supylabel('Speed (Mbps)', color=cfg.plot_text_color)
+        plt.tight_layout()
+
+        plt.savefig("group_plot.png", bbox_inches='tight')
+        plt.close()
+
+        open_image("group_plot.png")
+
+    except Exception as e:
+        log_error(e)
+
+
+def save_heatmap_plot():
+    # Median (top) and mean (bottom) per weekday and hour, built from the 7 x 24
+    # cached aggregates so it takes the same time for any history size
+    try:
+        heatmap_cache = get_heatmap_cache()
+        heatmap_cache.update()
+        if not heatmap_cache.counts_grid().any():
+            play_sound("error.wav")
+            return
+        play_sound("plot.wav")
+
+        fig, axes = plt.subplots(2, len(METRICS), figsize=(18, 6.5))
+        fig.patch.set_facecolor(cfg.plot_background_color)
+        units = {"download": "Mbps", "upload": "Mbps", "ping": "ms"}
+
+        for col, metric in enumerate(METRICS):
+            # Lower ping is better, so its colors run the other way
+            cmap = (speed_cmap.reversed() if metric == "ping" else speed_cmap).copy()
+            cmap.set_bad(cfg.plot_background_color)
+            for row, (statistic, grid) in enumerate((("Median", heatmap_cache.medians(metric)),
+                                                     ("Mean", heatmap_cache.means(metric)))):
+                ax = axes[row][col]
+                style_axes(fig, ax)
+                ax.grid(False)
+                image = ax.imshow(np.ma.masked_invalid(grid), cmap=cmap, aspect="auto", interpolation="nearest")
+                ax.set_title(f"{statistic} {metric.capitalize()} ({units[metric]})", color=cfg.plot_text_color)
+                ax.set_yticks(range(7))
+                ax.set_yticklabels(WEEKDAYS)
+                ax.set_xticks(range(0, 24, 2))
+                ax.set_xlabel("Hour", color=cfg.plot_text_color)
+
+                cbar = fig.colorbar(image, ax=ax)
+                cbar.ax.yaxis.set_tick_params(color=cfg.cbar_text_color)
+                for tick_label in cbar.ax.get_yticklabels():
+                    tick_label.set_color(cfg.cbar_text_color)
+
+        plt.tight_layout()
+
+        plt.savefig("heatmap_plot.png", bbox_inches='tight')
+        plt.close()
+
+        open_image("heatmap_plot.png")
+
+    except Exception as e:
+        log_error(e)
+
+
 # ==== GUI ====
 root = tk.Tk()
 root.title("ISTU v" + VERSION)
@@ -313,16 +389,15 @@ root.iconbitmap('istu.ico')
 root.configure(bg="#000000")
 root.resizable(False, False)
 
-frame_color = settings.get("frame_color", "#1e1e2e")
-frame = tk.Frame(root, bg=frame_color, padx=20, pady=20)
+frame = tk.Frame(root, bg=cfg.frame_color, padx=20, pady=20)
 frame.pack()
 
 title_label = tk.Label(
     frame,
     text="Internet Speed Test Utility",
     font=("Segoe UI", 18, "bold"),
-    fg=settings.get("ISTU_text_color", "#1bcca0"),
-    bg=frame_color
+    fg=cfg.ISTU_text_color,
+    bg=cfg.frame_color
 )
 
 title_label.grid(row=0, column=0, columnspan=3, pady=(0, 20))
@@ -335,25 +410,25 @@ output_label = tk.Label(
     anchor="w",
     wraplength=480,
     font=("Consolas", 11),
-    fg=settings.get("result_text_color", "#e0e0e0"),
-    bg=frame_color
+    fg=cfg.result_text_color,
+    bg=cfg.frame_color
 )
-output_label.grid(row=4, column=0, columnspan=3, pady=20)
+output_label.grid(row=5, column=0, columnspan=3, pady=20)
 
-# Load GIF & PNG
-idle_img = ImageTk.PhotoImage(Image.open("idle.png"))
-gif = Image.open("loading.gif")
-gif_frames = [ImageTk.PhotoImage(frame.copy().convert("RGBA")) for frame in ImageSequence.Iterator(gif)]
-gif_label = tk.Label(frame, image=idle_img, bg=frame_color)
-gif_label.grid(row=5, column=0, columnspan=3)
+# PNG is shown right away, the GIF frames are decoded on the first test
+idle_img = assets.image("idle.png")
+gif_label = tk.Label(frame, image=idle_img, bg=cfg.frame_color)
+gif_label.grid(row=6, column=0, columnspan=3)
 
 testing = tk.BooleanVar(value=False)
-def animate_gif(frame_index=0):
+def animate_gif(frame_index=0, gif_frames=None):
     if not root.winfo_exists():
         return  # Stop if root window is destroyed
     if testing.get():
+        if gif_frames is None:
+            gif_frames = assets.frames("loading.gif")  # decoded on the first test, then kept
         gif_label.configure(image=gif_frames[frame_index])
-        root.after(30, animate_gif, (frame_index + 1) % len(gif_frames))
+        root.after(30, animate_gif, (frame_index + 1) % len(gif_frames), gif_frames)
     else:
         gif_label.configure(image=idle_img)
 
@@ -393,19 +468,20 @@ def toggle_auto_test():
         if auto_test_enabled.get():
             if sound_enabled:
                 play_sound("auto_on.wav")
-            auto_btn.config(text="Auto Test: ON              ", bg=autotest_active_color)
+            auto_btn.config(text="Auto Test: ON              ", bg=cfg.autotest_active_color)
             schedule_auto_test()
         else:
             if sound_enabled:
                 play_sound("auto_off.wav")
-            auto_btn.config(text="Auto Test: OFF             ", bg=autotest_inactive_color)
+            auto_btn.config(text="Auto Test: OFF             ", bg=cfg.autotest_inactive_color)
     else:
         messagebox.showinfo("Info", "Please wait for the current test to finish.")
 
 def handle_speed_test():
+    global testing_sound
     if not testing.get():
-        if sound_enabled and testing_sound:
-            testing_sound.play(loops=-1)
+        if sound_enabled:
+            testing_sound = assets.play("testing.wav", loops=-1)
         output_text.set(f"Testing internet speed... Please wait...\n\n {output_text.get()}")
         testing.set(True)
         animate_gif()
@@ -426,7 +502,7 @@ def run_speed_test():
         ul_mbs = round(ul_mbps / 8, 3)
 
         try:
-            df = pd.read_csv("internet_data.txt", header=None)
+            df = pd.read_csv(HISTORY_FILE, header=None)
 
             if not df.empty and df.shape[1] >= 4:
                 # === Averages ===
@@ -473,6 +549,19 @@ def run_speed_test():
             comparison_dl = "N/A (error)"
             comparison_ul = "N/A (error)"
 
+        # === This ISP / location ===
+        try:
+            group_index = get_group_index()
+            group_index.update()
+            group = group_index.summary(group_index.key_for({"isp": result[5], "country": result[6], "lat": result[7], "lon": result[8]}))
+        except Exception as e:
+            log_error(f"Error updating group index: {e}")
+            group = None
+        if group:
+            group_line = f"\nThis ISP/location: {group['count']} tests | Avg D/U: {round(group['avg_download'], 2)} / {round(group['avg_upload'], 2)}"
+        else:
+            group_line = ""
+
         output_text.set(
             f"📅 {result[0]} | {result[1]}\n"
             f"📍 {result[5]} | {result[6].strip()} | {result[4]} | {result[7]}, {result[8]}\n\n"
@@ -485,13 +574,14 @@ def run_speed_test():
             f"Tests: {tests_run} | Avg D/U: {round(avg_dl, 2)} / {round(avg_ul, 2)} ({avg_dl_mbs}/{avg_ul_mbs})\n"
             f"Fastest D/U: {round(max_dl, 2)} / {round(max_ul, 2)} ({max_dl_mbs}/{max_ul_mbs})\n"
             f"Slowest D/U: {round(min_dl, 2)} / {round(min_ul, 2)} ({min_dl_mbs}/{min_ul_mbs})"
+            f"{group_line}"
         )
 
     else:
         output_text.set("❌ An error occurred during the speed test.\nCheck error_log.txt.")
 
-test_btn_style = {"font": ("Segoe UI", 12), "bg": test_button_background_color, "fg": test_button_text_color, "activebackground": test_button_click_color, "width": 25, "bd": 0, "relief": tk.FLAT}
-plot_btn_style = {"font": ("Segoe UI", 12), "bg": plot_button_background_color, "fg": plot_button_text_color, "activebackground": plot_button_click_color, "width": 25, "bd": 0, "relief": tk.FLAT}
+test_btn_style = {"font": ("Segoe UI", 12), "bg": cfg.test_button_background_color, "fg": cfg.test_button_text_color, "activebackground": cfg.test_button_click_color, "width": 25, "bd": 0, "relief": tk.FLAT}
+plot_btn_style = {"font": ("Segoe UI", 12), "bg": cfg.plot_button_background_color, "fg": cfg.plot_button_text_color, "activebackground": cfg.plot_button_click_color, "width": 25, "bd": 0, "relief": tk.FLAT}
 
 
 test_button = tk.Button(frame, text="🚀 Test Internet Speed", command=handle_speed_test, **test_btn_style)
@@ -500,6 +590,12 @@ test_button.grid(row=1, column=0, columnspan=3, pady=10)
 plot_button = tk.Button(frame, text="📈 Generate Scatter Plot", command=save_scatter_plot, **plot_btn_style)
 plot_button.grid(row=2, column=0, columnspan=3, pady=10)
 
+group_plot_button = tk.Button(frame, text="📊 Generate Group Plot", command=save_group_plot, **plot_btn_style)
+group_plot_button.grid(row=3, column=0, columnspan=3, pady=10)
+
+heatmap_button = tk.Button(frame, text="🗓 Generate Heatmap", command=save_heatmap_plot, **plot_btn_style)
+heatmap_button.grid(row=4, column=0, columnspan=3, pady=10)
+
 progress_bar_style = ttk.Style(root)
 progress_bar_style.theme_use('default')  # Make sure you're not using a native style
 progress_bar_style.configure("custom.Horizontal.TProgressbar",
@@ -508,12 +604,12 @@ progress_bar_style.configure("custom.Horizontal.TProgressbar",
                 thickness=20)
 progress_bar = ttk.Progressbar(frame, style="custom.Horizontal.TProgressbar",
                            orient="horizontal", length=200, mode="determinate")
-progress_bar.grid(row=6, column=1, columnspan=3, pady=(20, 5))
+progress_bar.grid(row=7, column=1, columnspan=3, pady=(20, 5))
 progress_bar["value"] = 100  # Set progress
 
 auto_btn = tk.Button(frame, text="Auto Test: OFF             ", command=toggle_auto_test,
-                     font=("Segoe UI", 12), fg=auto_test_text_color, width=20, bg=autotest_inactive_color, bd=0, relief=tk.FLAT)
-auto_btn.grid(row=6, column=0, columnspan=1, pady=(20, 5), padx=0)
+                     font=("Segoe UI", 12), fg=cfg.auto_test_text_color, width=20, bg=cfg.autotest_inactive_color, bd=0, relief=tk.FLAT)
+auto_btn.grid(row=7, column=0, columnspan=1, pady=(20, 5), padx=0)
 
 
 interval_spinbox = tk.Spinbox(
@@ -523,10 +619,10 @@ interval_spinbox = tk.Spinbox(
     width=5,
     textvariable=auto_test_interval,
     font=("Segoe UI", 11),
-    foreground=interval_text_color,
-    background=interval_background_color,
+    foreground=cfg.interval_text_color,
+    background=cfg.interval_background_color,
 )
-interval_spinbox.grid(row=6, column=0, sticky="w", pady=(20, 5), padx=(160, 0))
+interval_spinbox.grid(row=7, column=0, sticky="w", pady=(20, 5), padx=(160, 0))
 
 
 def on_interval_change(event):
@@ -538,39 +634,39 @@ interval_spinbox.bind("<KeyRelease>", on_interval_change)
 
 # === Mute Button ===
 def toggle_mute():
-    global sound_enabled
+    global sound_enabled, testing_sound
     sound_enabled = not sound_enabled
 
     if not sound_enabled and testing_sound:
         testing_sound.stop()  # Stop sound immediately when muting
 
-    elif sound_enabled and testing_sound and testing.get():
+    elif sound_enabled and testing.get():
         # If unmuting AND test is running, restart the looping sound
-        testing_sound.play(loops=-1)
+        testing_sound = assets.play("testing.wav", loops=-1)
 
     if sound_enabled:
-        mute_button.config(text="🔈 Sound ON", bg=sound_active_color)
+        mute_button.config(text="🔈 Sound ON", bg=cfg.sound_active_color)
     else:
-        mute_button.config(text="🔇 Muted", bg=sound_inactive_color)
+        mute_button.config(text="🔇 Muted", bg=cfg.sound_inactive_color)
 
 
 mute_button = tk.Button(frame, text="🔈 Sound ON", command=toggle_mute,
-                        font=("Segoe UI", 12), fg=sound_text_color, width=15, bg=sound_active_color, bd=0, relief=tk.FLAT)
-mute_button.grid(row=8, column=0, pady=(10, 20))
+                        font=("Segoe UI", 12), fg=cfg.sound_text_color, width=15, bg=cfg.sound_active_color, bd=0, relief=tk.FLAT)
+mute_button.grid(row=9, column=0, pady=(10, 20))
 
 # === Music Button and Logic ===
 
-# List all mp3 files in the MUSIC_FOLDER
-music_files = [f for f in os.listdir(MUSIC_FOLDER) if f.lower().endswith(".mp3")]
-
 music_playing = False
 
 def play_random_song():
+    # The music folder is listed again whenever it changes
+    music_files = assets.music_files()
     if not music_files:
         return
     song = random.choice(music_files)
     song_path = os.path.join(MUSIC_FOLDER, song)
     try:
+        assets.init_mixer()
         pygame.mixer.music.load(song_path)
         pygame.mixer.music.play()
     except Exception as e:
@@ -587,18 +683,89 @@ def toggle_music():
     if music_playing:
         pygame.mixer.music.stop()
         music_playing = False
-        music_button.config(text="🎵 Music OFF", bg=music_inactive_color)
+        music_button.config(text="🎵 Music OFF", bg=cfg.music_inactive_color)
     else:
-        if not music_files:
+        if not assets.music_files():
             messagebox.showwarning("No Music", "No mp3 files found in the 'sounds/music' folder.")
             return
         music_playing = True
-        music_button.config(text="🎵 Music ON", bg=music_active_color)
+        music_button.config(text="🎵 Music ON", bg=cfg.music_active_color)
         play_random_song()
         check_music()
 
 music_button = tk.Button(frame, text="🎵 Music OFF", command=toggle_music,
-                         font=("Segoe UI", 12), fg=music_test_text_color, width=15, bg=music_inactive_color, bd=0, relief=tk.FLAT)
-music_button.grid(row=8, column=1, pady=(10, 20), padx=(10,0))
+                         font=("Segoe UI", 12), fg=cfg.music_test_text_color, width=15, bg=cfg.music_inactive_color, bd=0, relief=tk.FLAT)
+music_button.grid(row=9, column=1, pady=(10, 20), padx=(10,0))
+
+# === Settings hot reload ===
+# Widget options that follow a setting. Toggle button backgrounds depend on
+# their state and are handled in refresh_toggle_colors().
+SETTING_WIDGETS = {
+    "frame_color": [(frame, "bg"), (title_label, "bg"), (output_label, "bg"), (gif_label, "bg")],
+    "ISTU_text_color": [(title_label, "fg")],
+    "result_text_color": [(output_label, "fg")],
+    "test_button_text_color": [(test_button, "fg")],
+    "test_button_background_color": [(test_button, "bg")],
+    "test_button_click_color": [(test_button, "activebackground")],
+    "plot_button_text_color": [(plot_button, "fg"), (group_plot_button, "fg"), (heatmap_button, "fg")],
+    "plot_button_background_color": [(plot_button, "bg"), (group_plot_button, "bg"), (heatmap_button, "bg")],
+    "plot_button_click_color": [(plot_button, "activebackground"), (group_plot_button, "activebackground"),
+                                (heatmap_button, "activebackground")],
+    "auto_test_text_color": [(auto_btn, "fg")],
+    "sound_text_color": [(mute_button, "fg")],
+    "music_test_text_color": [(music_button, "fg")],
+    "interval_text_color": [(interval_spinbox, "foreground")],
+    "interval_background_color": [(interval_spinbox, "background")],
+}
+TOGGLE_COLORS = {"sound_active_color", "sound_inactive_color", "music_active_color",
+                 "music_inactive_color", "autotest_active_color", "autotest_inactive_color"}
+
+settings_watcher = SettingsWatcher(SETTINGS_FILE)
+
+def refresh_toggle_colors():
+    mute_button.config(bg=cfg.sound_active_color if sound_enabled else cfg.sound_inactive_color)
+    music_button.config(bg=cfg.music_active_color if music_playing else cfg.music_inactive_color)
+    auto_btn.config(bg=cfg.autotest_active_color if auto_test_enabled.get() else cfg.autotest_inactive_color)
+
+def apply_settings(new_values):
+    # Only settings that differ from the running ones touch the GUI
+    global MUSIC_FOLDER, HISTORY_FILE, group_index, heatmap_cache, speed_cmap
+    changed = {name: value for name, value in new_values.items() if getattr(cfg, name) != value}
+    if not changed:
+        return
+    for name, value in changed.items():
+        setattr(cfg, name, value)
+
+    for name in changed:
+        for widget, option in SETTING_WIDGETS.get(name, []):
+            widget.config(**{option: changed[name]})
+    if TOGGLE_COLORS & changed.keys():
+        refresh_toggle_colors()
+
+    if "plot_colors_list" in changed:
+        speed_cmap = mcolors.LinearSegmentedColormap.from_list("speed_cmap", cfg.plot_colors_list)
+    if "music_folder" in changed:
+        MUSIC_FOLDER = os.path.join(os.path.dirname(__file__), cfg.music_folder)
+        assets.set_music_folder(MUSIC_FOLDER)
+    if "history_file" in changed:
+        HISTORY_FILE = cfg.history_file
+        with stats_lock:
+            group_index = None
+            heatmap_cache = None
+
+def check_settings():
+    if not root.winfo_exists():
+        return
+    if settings_watcher.changed():
+        loaded = load_settings()
+        if loaded is not None:
+            try:
+                # Tk exists by now, so widget colors are checked against it
+                apply_settings(validated(loaded, root.winfo_rgb))
+            except Exception as e:
+                log_error(f"Failed to apply settings: {e}")
+    root.after(1000, check_settings)
+
+check_settings()
 
 root.mainloop()
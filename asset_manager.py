@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pygame
+
+# ==== Shared asset cache ====
+# Used by ISTU.py and theme_manager.py. Sounds and images are decoded on first
+# use instead of at startup and kept in a least-recently-used cache limited to
+# CACHE_BUDGET bytes. Animations are pinned instead: the loading GIF alone
+# decodes to more than the budget and is needed on every test. The music folder
+# is re-listed only when its modification time changes, so new .mp3 files show
+# up without a restart.
+BASE_FOLDER = os.path.dirname(os.path.abspath(__file__))
+SOUND_FOLDER = os.path.join(BASE_FOLDER, "sounds")
+CACHE_BUDGET = 16 * 1024 * 1024  # bytes
+
+
+class AssetManager:
+    def __init__(self, sound_folder=SOUND_FOLDER, music_folder=None, budget=CACHE_BUDGET):
+        self.sound_folder = sound_folder
+        self.music_folder = music_folder
+        self.budget = budget
+        self.cache = OrderedDict()  # key -> (asset, size)
+        self.cache_size = 0
+        self.pinned = {}  # key -> asset, never evicted
+        self.lock = threading.Lock()
+        self.music_mtime = None
+        self.music_list = []
+
+    # ==== Mixer ====
+    def init_mixer(self):
+        # The mixer is started on first use, not at import
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+
+    # ==== Cache ====
+    def get(self, key, load, pin=False):
+        with self.lock:
+            if key in self.pinned:
+                return self.pinned[key]
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key][0]
+        asset, size = load()
+        with self.lock:
+            if pin:
+                return self.pinned.setdefault(key, asset)
+            if key not in self.cache:
+                self.cache[key] = (asset, size)
+                self.cache_size += size
+            self.cache.move_to_end(key)
+            # Evict least recently used entries, always keeping the newest one
+            while self.cache_size > self.budget and len(self.cache) > 1:
+                _, (_, old_size) = self.cache.popitem(last=False)
+                self.cache_size -= old_size
+            return self.cache[key][0]
+
+    # ==== Sounds ====
+    def sound(self, filename):
+        # Returns a pygame Sound, or None if the file is missing or can't be decoded
+        path = os.path.join(self.sound_folder, filename)
+
+        def load():
+            if not os.path.exists(path):
+                return None, 0
+            try:
+                self.init_mixer()
+                sound = pygame.mixer.Sound(path)
+                # Size after the mixer resampled it, not the size on disk
+                return sound, len(sound.get_raw())
+            except pygame.error:
+                return None, 0
+
+        return self.get(("sound", path), load)
+
+    def play(self, filename, loops=0):
+        sound = self.sound(filename)
+        if sound:
+            sound.play(loops=loops)
+        return sound
+
+    # ==== Images ====
+    def image(self, path):
+        # Tk PhotoImage of a still image, needs a Tk root to exist
+        def load():
+            from PIL import Image, ImageTk
+            img = Image.open(path)
+            return ImageTk.PhotoImage(img), img.width * img.height * 4
+
+        return self.get(("image", path), load)
+
+    def frames(self, path):
+        # Tk PhotoImages of every frame of an animated image
+        def load():
+            from PIL import Image, ImageTk, ImageSequence
+            gif = Image.open(path)
+            frames = [ImageTk.PhotoImage(frame.copy().convert("RGBA")) for frame in ImageSequence.Iterator(gif)]
+            return frames, gif.width * gif.height * 4 * len(frames)
+
+        return self.get(("frames", path), load, pin=True)
+
+    # ==== Music ====
+    def set_music_folder(self, folder):
+        self.music_folder = folder
+        self.music_mtime = None  # list the new folder on the next call
+
+    def music_files(self):
+        # Cheap to call often: the folder is only listed again when it changed
+        if not self.music_folder:
+            return []
+        try:
+            mtime = os.stat(self.music_folder).st_mtime_ns
+        except OSError:
+            self.music_mtime = None
+            self.music_list = []
+            return self.music_list
+        if mtime != self.music_mtime:
+            self.music_mtime = mtime
+            self.music_list = [f for f in os.listdir(self.music_folder) if f.lower().endswith(".mp3")]
+        return self.music_list
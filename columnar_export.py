@@ -0,0 +1,238 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pyarrow.feather as feather
+
+from data_log import DATA_FILE, iter_rows, new_bytes
+
+# ==== Columnar export ====
+# Copies the result log into a typed Parquet (or Arrow IPC) dataset for offline
+# analysis, partitioned by month (export/month=2025-01/data.parquet).
+# ISP, country and host are dictionary encoded and Parquet keeps min/max
+# statistics per row group, so filtered reads skip months and row groups that
+# can't match. Each run only exports rows appended since the previous run; a
+# month that gets new rows has its file rewritten, so it stays one file with
+# full row groups however often the export runs.
+EXPORT_FOLDER = "export"
+# Kept inside the export folder next to the month folders
+STATE_FILE = "_export_state.json"
+BATCH_ROWS = 50_000
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("s")),
+    ("download", pa.float64()),
+    ("upload", pa.float64()),
+    ("ping", pa.int32()),
+    ("isp", pa.dictionary(pa.int32(), pa.string())),
+    ("country", pa.dictionary(pa.int32(), pa.string())),
+    ("lat", pa.float64()),
+    ("lon", pa.float64()),
+    ("host", pa.dictionary(pa.int32(), pa.string())),
+])
+PARTITIONING = ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+
+
+def load_state(folder=EXPORT_FOLDER):
+    state_file = os.path.join(folder, STATE_FILE)
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, "r") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {}
+
+
+def save_state(state, folder=EXPORT_FOLDER):
+    os.makedirs(folder, exist_ok=True)
+    state_file = os.path.join(folder, STATE_FILE)
+    tmp_file = state_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, state_file)
+
+
+def parse_timestamp(row):
+    return datetime.datetime.strptime(f"{row['date']} {row['time']}", "%Y-%m-%d %H:%M:%S")
+
+
+def to_table(rows):
+    columns = {name: [] for name in SCHEMA.names}
+    for row in rows:
+        columns["timestamp"].append(parse_timestamp(row))
+        for name in ("download", "upload", "ping", "isp", "country", "lat", "lon", "host"):
+            columns[name].append(row[name])
+    return pa.table(columns, schema=SCHEMA)
+
+
+def month_path(folder, month, file_format):
+    return os.path.join(folder, f"month={month}", f"data{FORMATS[file_format]}")
+
+
+def read_month(path, file_format):
+    if file_format == "parquet":
+        table = pq.read_table(path, partitioning=None)
+    else:
+        table = feather.read_table(path)
+    return table.select(SCHEMA.names).cast(SCHEMA)
+
+
+def write_month(table, folder, month, file_format):
+    # Adds the rows to the month's file by rewriting it in one go
+    path = month_path(folder, month, file_format)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        table = pa.concat_tables([read_month(path, file_format), table])
+    tmp_file = path + ".tmp"
+    if file_format == "parquet":
+        # Row groups of BATCH_ROWS rows, with min/max statistics for every column
+        pq.write_table(table, tmp_file, row_group_size=BATCH_ROWS, write_statistics=True)
+    else:
+        feather.write_feather(table, tmp_file, compression="uncompressed")
+    os.replace(tmp_file, path)
+    return path
+
+
+def flush(batches, folder, file_format):
+    for month, rows in sorted(batches.items()):
+        write_month(to_table(rows), folder, month, file_format)
+    batches.clear()
+
+
+def remove_export(folder):
+    # Only removes what export() writes, never anything else in the folder
+    for pattern in ("month=*/data.*", "month=*/data.*.tmp", STATE_FILE):
+        for path in glob.glob(os.path.join(folder, pattern)):
+            os.remove(path)
+    for month_folder in glob.glob(os.path.join(folder, "month=*")):
+        if os.path.isdir(month_folder) and not os.listdir(month_folder):
+            os.rmdir(month_folder)
+
+
+def export(source=DATA_FILE, folder=EXPORT_FOLDER, file_format="parquet"):
+    # Returns the number of rows exported. Raises ValueError if the folder
+    # already holds an export of another source or in another format.
+    state = load_state(folder)
+    if state.get("source", os.path.abspath(source)) != os.path.abspath(source):
+        raise ValueError(f"{folder} holds an export of {state['source']}, use another --folder")
+    if state.get("format", file_format) != file_format:
+        raise ValueError(f"{folder} holds a {state['format']} export, "
+                         f"use --format {state['format']} or another --folder")
+    start, end, file_id = new_bytes(source, state.get("offset", 0), state.get("file_id"))
+    if not state or start != state.get("offset", 0):
+        # New export, or the source was rewritten: export everything again
+        remove_export(folder)
+        state = {"source": os.path.abspath(source), "format": file_format, "offset": 0}
+    state["file_id"] = file_id
+
+    exported = 0
+    batches = {}
+    pending = 0
+    for _, row in iter_rows(source, state["offset"], end):
+        batches.setdefault(row["date"][:7], []).append(row)
+        pending += 1
+        exported += 1
+        if pending >= BATCH_ROWS:
+            flush(batches, folder, file_format)
+            pending = 0
+    flush(batches, folder, file_format)
+
+    state["offset"] = end
+    save_state(state, folder)
+    return exported
+
+
+def open_dataset(folder=EXPORT_FOLDER, file_format="parquet"):
+    # Only the month files export() wrote, the folder may hold other files
+    paths = sorted(glob.glob(os.path.join(folder, "month=*", f"data{FORMATS[file_format]}")))
+    return ds.dataset(paths, format="parquet" if file_format == "parquet" else "ipc",
+                      partitioning=PARTITIONING, partition_base_dir=folder,
+                      schema=SCHEMA.append(pa.field("month", pa.string())))
+
+
+def build_filter(isp=None, country=None, host=None, since=None, until=None,
+                 min_download=None, max_download=None, min_upload=None, max_upload=None, max_ping=None):
+    # Date bounds also filter the month partition so whole folders are skipped
+    conditions = []
+    if isp:
+        conditions.append(ds.field("isp") == isp)
+    if country:
+        conditions.append(ds.field("country") == country)
+    if host:
+        conditions.append(ds.field("host") == host)
+    if since:
+        conditions.append(ds.field("month") >= since.strftime("%Y-%m"))
+        conditions.append(ds.field("timestamp") >= pa.scalar(since, type=pa.timestamp("s")))
+    if until:
+        conditions.append(ds.field("month") <= until.strftime("%Y-%m"))
+        conditions.append(ds.field("timestamp") < pa.scalar(until, type=pa.timestamp("s")))
+    for name, low, high in (("download", min_download, max_download), ("upload", min_upload, max_upload),
+                            ("ping", None, max_ping)):
+        if low is not None:
+            conditions.append(ds.field(name) >= low)
+        if high is not None:
+            conditions.append(ds.field(name) < high)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def query(folder=EXPORT_FOLDER, file_format="parquet", columns=None, **filters):
+    return open_dataset(folder, file_format).to_table(columns=columns, filter=build_filter(**filters))
+
+
+def parse_date(value):
+    return datetime.datetime.strptime(value, "%Y-%m-%d")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export internet_data.txt to Parquet / Arrow and query it.")
+    parser.add_argument("--folder", default=EXPORT_FOLDER)
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="append new results to the export folder")
+    export_parser.add_argument("--source", default=DATA_FILE, help="result log, e.g. fleet_data.txt")
+
+    query_parser = commands.add_parser("query", help="print results matching the filters")
+    query_parser.add_argument("--isp")
+    query_parser.add_argument("--country")
+    query_parser.add_argument("--host")
+    query_parser.add_argument("--since", type=parse_date, help="YYYY-MM-DD")
+    query_parser.add_argument("--until", type=parse_date, help="YYYY-MM-DD (not included)")
+    query_parser.add_argument("--last-days", type=int, help="shortcut for --since, e.g. 90 for the last quarter")
+    query_parser.add_argument("--min-download", type=float)
+    query_parser.add_argument("--max-download", type=float, help="download below this Mbps")
+    query_parser.add_argument("--min-upload", type=float)
+    query_parser.add_argument("--max-upload", type=float, help="upload below this Mbps")
+    query_parser.add_argument("--max-ping", type=int)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        try:
+            exported = export(args.source, args.folder, args.format)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Exported {exported} new rows to {args.folder}")
+    elif args.command == "query":
+        since = args.since
+        if args.last_days:
+            since = datetime.datetime.now() - datetime.timedelta(days=args.last_days)
+        table = query(args.folder, args.format, isp=args.isp, country=args.country, host=args.host,
+                      since=since, until=args.until, min_download=args.min_download,
+                      max_download=args.max_download, min_upload=args.min_upload,
+                      max_upload=args.max_upload, max_ping=args.max_ping)
+        print(table.to_pandas().to_string(index=False))
+        print(f"{table.num_rows} rows")
+
+
+if __name__ == "__main__":
+    main()
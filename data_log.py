@@ -0,0 +1,159 @@
+import datetime
+import os
+import re
+import zlib
+
+# ==== Result log layout ====
+# Every line in internet_data.txt is written by ISTU.collect_data() as:
+# date,time,download,upload,ping,isp,country,lat,lon
+# Merged fleet logs (see fleet_merge.py) add the probe's host name as a last column.
+DATA_FILE = "internet_data.txt"
+COLUMNS = ["date", "time", "download", "upload", "ping", "isp", "country", "lat", "lon"]
+# Zero padded, as written by collect_data(); merging and the heatmap rely on it
+DATE_TIME = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+
+
+def is_timestamp(date, time):
+    stamp = f"{date} {time}"
+    if not DATE_TIME.match(stamp):
+        return False
+    try:
+        datetime.datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S")
+        return True
+    except ValueError:
+        return False
+
+
+def is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def parse_row(line):
+    # Returns the row as a dict, or None if the line is blank or malformed.
+    # The ISP name is the only free-text field that may contain commas, so the
+    # fixed fields are taken from both ends and whatever is left is the ISP.
+    if isinstance(line, bytes):
+        line = line.decode("utf-8", errors="replace")
+    parts = line.strip().split(",")
+    if len(parts) < len(COLUMNS):
+        return None
+    # A country is never numeric, so a number in its place means lat/lon moved
+    # one column left to make room for a host tag.
+    host = None
+    if len(parts) > len(COLUMNS) and is_number(parts[-3]):
+        host = parts[-1].strip()
+        parts = parts[:-1]
+    if not is_timestamp(parts[0].strip(), parts[1].strip()):
+        return None
+    try:
+        return {
+            "date": parts[0].strip(),
+            "time": parts[1].strip(),
+            "download": float(parts[2]),
+            "upload": float(parts[3]),
+            "ping": int(float(parts[4])),
+            "isp": ",".join(parts[5:-3]).strip(),
+            "country": parts[-3].strip(),
+            "lat": float(parts[-2]),
+            "lon": float(parts[-1]),
+            "host": host,
+        }
+    except ValueError:
+        return None
+
+
+def format_row(row):
+    line = ",".join(str(row[column]) for column in COLUMNS)
+    if row.get("host"):
+        line += "," + row["host"]
+    return line
+
+
+def time_in_hours(time_str):
+    h, m, s = time_str.split(":")
+    return int(h) + int(m) / 60 + int(s) / 3600
+
+
+def iter_rows(path=DATA_FILE, start=0, end=None):
+    # Yields (byte_offset, row) for every valid line between byte offsets `start`
+    # and `end`. Only complete lines are returned, so a line that is still being
+    # written is picked up on the next call.
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if not line.endswith(b"\n") or (end is not None and offset >= end):
+                break
+            row = parse_row(line)
+            if row is not None:
+                yield offset, row
+            offset += len(line)
+
+
+def read_rows_at(path, offsets):
+    # Reads only the lines at the given byte offsets instead of the whole log.
+    rows = []
+    with open(path, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            row = parse_row(f.readline())
+            if row is not None:
+                rows.append(row)
+    return rows
+
+
+def complete_size(path=DATA_FILE):
+    # Size of the file up to and including its last newline.
+    if not os.path.exists(path):
+        return 0
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+    with open(path, "rb") as f:
+        f.seek(max(0, size - 1))
+        if f.read(1) == b"\n":
+            return size
+        # Walk back to the last newline so a partial line is read next time.
+        block = 4096
+        pos = size
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            index = chunk.rfind(b"\n")
+            if index != -1:
+                return pos + index + 1
+    return 0
+
+
+def file_id(path=DATA_FILE):
+    # Inode plus a checksum of the first line. Inode numbers are handed out
+    # again as soon as a file is deleted, the first line tells the files apart.
+    try:
+        with open(path, "rb") as f:
+            first = f.readline()
+            inode = os.fstat(f.fileno()).st_ino
+    except OSError:
+        return None
+    # A first line that is still being written doesn't count yet
+    checksum = zlib.crc32(first) if first.endswith(b"\n") else 0
+    return f"{inode}-{checksum}"
+
+
+def new_bytes(path, offset, known_id):
+    # Returns (start, end, file_id) of the complete lines appended since `offset`.
+    # If the log got shorter or was swapped for a new file (fleet_merge.py
+    # rewrites its history that way) start is 0, and whatever was built from
+    # the old bytes has to be rebuilt.
+    end = complete_size(path)
+    current = file_id(path)
+    if end < offset or (offset and current != known_id):
+        offset = 0
+    return offset, end, current
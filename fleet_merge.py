@@ -0,0 +1,357 @@
+import argparse
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import re
+import socket
+import socketserver
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from data_log import DATA_FILE, complete_size, format_row, iter_rows, new_bytes, parse_row
+
+# ==== Fleet aggregation ====
+# Result logs from many probe machines are merged into one history file that
+# ISTU can plot (set "history_file" in settings.json to FLEET_FILE).
+#
+# Sources are the *.txt files in FLEET_FOLDER (the file name is the host tag)
+# plus any file passed with --source. Each source is read from the byte offset
+# reached on the previous run, so re-runs only read new bytes. New rows from all
+# sources are k-way merged by timestamp with heapq.merge, which keeps one row
+# per source in memory, and replayed rows are dropped. A source whose new rows
+# are out of order is sorted first.
+#
+# Probes can also push their log over a local TCP socket (see serve/push); the
+# pushed rows are spooled into FLEET_FOLDER and ingested like a file drop. The
+# server remembers how far into each probe's log it has received, so a push
+# only sends the bytes written since the previous one. The server has no
+# authentication, so it only listens on the loopback interface.
+#
+# Every read-modify-write of STATE_FILE and FLEET_FILE holds a lock file next to
+# STATE_FILE, so "ingest" can run while "serve" is ingesting pushes.
+FLEET_FOLDER = "fleet"
+FLEET_FILE = "fleet_data.txt"
+STATE_FILE = "fleet_state.json"
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 50515
+
+ingest_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def state_lock(state_file=STATE_FILE):
+    # Blocks until no other thread or process holds the lock
+    with ingest_lock, open(state_file + ".lock", "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds, keep waiting
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def clean_host(host):
+    # Host tags end up in file names and as a CSV column
+    host = re.sub(r"[^A-Za-z0-9_.-]", "_", str(host).strip())
+    return host or "unknown"
+
+
+def host_from_path(path):
+    return clean_host(os.path.splitext(os.path.basename(path))[0])
+
+
+def timestamp_key(row):
+    # Dates and times are zero padded ISO strings, so they sort as text
+    return row["date"], row["time"]
+
+
+def row_key(row):
+    return [row["date"], row["time"], row["host"], row["download"], row["upload"], row["ping"]]
+
+
+def find_sources(fleet_folder=FLEET_FOLDER, extra_sources=None):
+    sources = []
+    if os.path.isdir(fleet_folder):
+        for name in sorted(os.listdir(fleet_folder)):
+            if name.lower().endswith(".txt"):
+                path = os.path.join(fleet_folder, name)
+                sources.append((path, host_from_path(path)))
+    for source in extra_sources or []:
+        path, _, host = source.partition("=")
+        sources.append((path, clean_host(host) if host else host_from_path(path)))
+    return sources
+
+
+def load_state(state_file=STATE_FILE):
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, "r") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {"sources": {}, "tail_timestamp": None, "tail_keys": [], "pushed": {}}
+
+
+def save_state(state, state_file=STATE_FILE):
+    tmp_file = state_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, state_file)
+
+
+def source_rows(path, host, start, end):
+    for _, row in iter_rows(path, start, end):
+        row["host"] = host
+        row["new"] = True
+        yield row
+
+
+def merge_ready_rows(path, host, start, end):
+    # heapq.merge needs every source in timestamp order. Probe logs normally
+    # are, but a clock change or a hand-concatenated file is not; those new
+    # rows are sorted in memory instead of streamed.
+    previous = None
+    for row in source_rows(path, host, start, end):
+        timestamp = timestamp_key(row)
+        if previous is not None and timestamp < previous:
+            return sorted(source_rows(path, host, start, end), key=timestamp_key)
+        previous = timestamp
+    return source_rows(path, host, start, end)
+
+
+def tagged_rows(path):
+    for _, row in iter_rows(path):
+        if not row["host"]:
+            row["host"] = "unknown"
+        yield row
+
+
+def drop_replays(rows, seen_timestamp=None, seen_keys=None):
+    # Rows arrive sorted by timestamp, so a replay can only collide with rows
+    # that share its timestamp. Only those keys are kept in memory.
+    current = list(seen_timestamp) if seen_timestamp else None
+    keys = {tuple(k) for k in seen_keys or []}
+    for row in rows:
+        timestamp = list(timestamp_key(row))
+        if timestamp != current:
+            current = timestamp
+            keys = set()
+        key = tuple(row_key(row))
+        if key in keys:
+            continue
+        keys.add(key)
+        yield row
+
+
+def ingest(extra_sources=None, fleet_folder=FLEET_FOLDER, fleet_file=FLEET_FILE, state_file=STATE_FILE):
+    # Returns the number of new rows written to fleet_file
+    with state_lock(state_file):
+        state = load_state(state_file)
+        if not os.path.exists(fleet_file):
+            # History was deleted, start over from the beginning of every source.
+            # Pushed offsets stay, the spooled rows are still in FLEET_FOLDER.
+            state = {"sources": {}, "tail_timestamp": None, "tail_keys": [], "pushed": state.get("pushed", {})}
+
+        streams = []
+        first_timestamps = []
+        new_offsets = {}
+        for path, host in find_sources(fleet_folder, extra_sources):
+            source_id = os.path.abspath(path)
+            previous = state["sources"].get(source_id, {})
+            # Starts over if the source was truncated or replaced (a rotated
+            # log), replays get dropped below
+            start, end, file_id = new_bytes(path, previous.get("offset", 0), previous.get("file_id"))
+            if end == start:
+                if previous.get("file_id") != file_id:
+                    new_offsets[source_id] = {"offset": end, "file_id": file_id, "host": host}
+                continue
+            rows = iter(merge_ready_rows(path, host, start, end))
+            first = next(rows, None)
+            if first is not None:
+                first_timestamps.append(list(timestamp_key(first)))
+                streams.append(itertools.chain([first], rows))
+            new_offsets[source_id] = {"offset": end, "file_id": file_id, "host": host}
+
+        written = 0
+        tail_timestamp = state["tail_timestamp"]
+        tail_keys = state["tail_keys"]
+        if streams:
+            new_rows = heapq.merge(*streams, key=timestamp_key)
+            if tail_timestamp is None or min(first_timestamps) >= tail_timestamp:
+                # Common case: everything new is newer than the history, append
+                rows = drop_replays(new_rows, tail_timestamp, tail_keys)
+                mode = "a"
+                out_file = fleet_file
+            else:
+                # Late rows, rewrite the history in one streaming merge pass
+                rows = drop_replays(heapq.merge(tagged_rows(fleet_file), new_rows, key=timestamp_key))
+                mode = "w"
+                out_file = fleet_file + ".tmp"
+
+            with open(out_file, mode) as f:
+                for row in rows:
+                    f.write(format_row(row) + "\n")
+                    if row.get("new"):
+                        written += 1
+                    timestamp = list(timestamp_key(row))
+                    if timestamp != tail_timestamp:
+                        tail_timestamp = timestamp
+                        tail_keys = []
+                    tail_keys.append(row_key(row))
+            if mode == "w":
+                os.replace(out_file, fleet_file)
+
+        state["sources"].update(new_offsets)
+        state["tail_timestamp"] = tail_timestamp
+        state["tail_keys"] = tail_keys
+        save_state(state, state_file)
+        return written
+
+
+def pushed_offset(host, state_file=STATE_FILE):
+    with state_lock(state_file):
+        return load_state(state_file).get("pushed", {}).get(host, 0)
+
+
+def set_pushed_offset(host, offset, state_file=STATE_FILE):
+    with state_lock(state_file):
+        state = load_state(state_file)
+        state.setdefault("pushed", {})[host] = offset
+        save_state(state, state_file)
+
+
+# ==== Socket pushes ====
+# Protocol:
+#   client: "HOST <name>"
+#   server: "OFFSET <bytes of this host's log already received>"
+#   client: "FROM <byte offset it sends from>", then the log from that offset
+#           (0 if its log is now shorter than the server's offset)
+#   server: "OK <rows received>" once the client closes its side
+class PushHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        header = self.rfile.readline().decode("utf-8", errors="replace").strip()
+        if not header.startswith("HOST "):
+            self.wfile.write(b"ERROR expected HOST line\n")
+            return
+        host = clean_host(header[5:])
+        self.wfile.write(f"OFFSET {pushed_offset(host, self.server.state_file)}\n".encode("utf-8"))
+        self.wfile.flush()
+
+        start = self.rfile.readline().decode("utf-8", errors="replace").strip()
+        if not start.startswith("FROM ") or not start[5:].isdigit():
+            self.wfile.write(b"ERROR expected FROM line\n")
+            return
+        offset = int(start[5:])
+
+        received = 0
+        # Whole lines are written one at a time, ingest never reads a partial one
+        spool = os.path.join(self.server.fleet_folder, host + ".txt")
+        with open(spool, "ab") as f:
+            for line in self.rfile:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                if parse_row(line) is not None:
+                    f.write(line.rstrip(b"\r\n") + b"\n")
+                    f.flush()
+                    received += 1
+        set_pushed_offset(host, offset, self.server.state_file)
+        ingest(fleet_folder=self.server.fleet_folder, fleet_file=self.server.fleet_file,
+               state_file=self.server.state_file)
+        self.wfile.write(f"OK {received}\n".encode("utf-8"))
+
+
+class PushServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, fleet_folder=FLEET_FOLDER, fleet_file=FLEET_FILE, state_file=STATE_FILE):
+        self.fleet_folder = fleet_folder
+        self.fleet_file = fleet_file
+        self.state_file = state_file
+        os.makedirs(fleet_folder, exist_ok=True)
+        super().__init__(address, PushHandler)
+
+
+def serve(port=SERVER_PORT):
+    # Always SERVER_HOST: anyone who can connect can write into FLEET_FOLDER
+    ingest()
+    with PushServer((SERVER_HOST, port)) as server:
+        print(f"Listening for fleet pushes on {SERVER_HOST}:{port}")
+        server.serve_forever()
+
+
+def push(path=DATA_FILE, host=None, server_host=SERVER_HOST, port=SERVER_PORT):
+    host = clean_host(host or socket.gethostname())
+    end = complete_size(path)
+    with socket.create_connection((server_host, port)) as conn, open(path, "rb") as f:
+        replies = conn.makefile("rb")
+        conn.sendall(f"HOST {host}\n".encode("utf-8"))
+        reply = replies.readline().decode("utf-8").strip()
+        if not reply.startswith("OFFSET "):
+            return reply
+        start = int(reply[7:])
+        if start > end:
+            # Log was replaced or truncated, send it all, the server drops replays
+            start = 0
+        conn.sendall(f"FROM {start}\n".encode("utf-8"))
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(65536, remaining))
+            if not chunk:
+                break
+            conn.sendall(chunk)
+            remaining -= len(chunk)
+        conn.shutdown(socket.SHUT_WR)
+        return replies.readline().decode("utf-8").strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge internet_data.txt logs from many probes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help=f"merge new rows from {FLEET_FOLDER}/ into {FLEET_FILE}")
+    ingest_parser.add_argument("--source", action="append", default=[], metavar="PATH[=HOST]",
+                               help="extra log to merge, e.g. internet_data.txt=local")
+
+    serve_parser = commands.add_parser("serve", help=f"accept pushes from probes on {SERVER_HOST}")
+    serve_parser.add_argument("--port", type=int, default=SERVER_PORT)
+
+    push_parser = commands.add_parser("push", help="send a log to a running fleet server")
+    push_parser.add_argument("path", nargs="?", default=DATA_FILE)
+    push_parser.add_argument("--as-host", dest="as_host", default=None, help="host tag (default: this machine's name)")
+    push_parser.add_argument("--host", default=SERVER_HOST)
+    push_parser.add_argument("--port", type=int, default=SERVER_PORT)
+
+    args = parser.parse_args()
+    if args.command == "ingest":
+        print(f"Merged {ingest(args.source)} new rows into {FLEET_FILE}")
+    elif args.command == "serve":
+        serve(args.port)
+    elif args.command == "push":
+        print(push(args.path, args.as_host, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
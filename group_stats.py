@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+
+from data_log import DATA_FILE, iter_rows, new_bytes, read_rows_at
+
+# ==== Grouped analytics ====
+# Results are grouped by ISP, country and lat/lon rounded to LOCATION_PRECISION
+# decimals (1 decimal is roughly 11 km). Each group keeps running totals in
+# INDEX_FILE, so stats come straight from the index. The byte offset of every
+# row goes to an append-only sidecar ("<group id> <offset>" per line), so an
+# update only writes the new rows and the offsets are read only when a group's
+# rows are asked for.
+INDEX_FILE = "group_index.json"
+LOCATION_PRECISION = 1
+INDEX_VERSION = 2
+
+# ISTU updates the index from its speed test thread and from the plot buttons.
+# One lock for every GroupIndex, since instances can share INDEX_FILE.
+index_lock = threading.RLock()
+
+
+def group_key(isp, country, lat, lon, precision=LOCATION_PRECISION):
+    return f"{isp}|{country}|{round(float(lat), precision)}|{round(float(lon), precision)}"
+
+
+def split_group_key(key):
+    isp, country, lat, lon = key.rsplit("|", 3)
+    return isp, country, float(lat), float(lon)
+
+
+def new_group(group_id):
+    return {
+        "id": group_id,
+        "count": 0,
+        "download_sum": 0.0,
+        "upload_sum": 0.0,
+        "ping_sum": 0,
+        "download_min": None,
+        "download_max": None,
+        "upload_min": None,
+        "upload_max": None,
+        "first_date": None,
+        "last_date": None,
+    }
+
+
+def add_to_group(group, row):
+    group["count"] += 1
+    group["download_sum"] += row["download"]
+    group["upload_sum"] += row["upload"]
+    group["ping_sum"] += row["ping"]
+    for field in ("download", "upload"):
+        value = row[field]
+        if group[f"{field}_min"] is None or value < group[f"{field}_min"]:
+            group[f"{field}_min"] = value
+        if group[f"{field}_max"] is None or value > group[f"{field}_max"]:
+            group[f"{field}_max"] = value
+    if group["first_date"] is None:
+        group["first_date"] = row["date"]
+    group["last_date"] = row["date"]
+
+
+def group_summary(group):
+    count = group["count"]
+    if not count:
+        return None
+    return {
+        "count": count,
+        "avg_download": group["download_sum"] / count,
+        "avg_upload": group["upload_sum"] / count,
+        "avg_ping": group["ping_sum"] / count,
+        "min_download": group["download_min"],
+        "max_download": group["download_max"],
+        "min_upload": group["upload_min"],
+        "max_upload": group["upload_max"],
+        "first_date": group["first_date"],
+        "last_date": group["last_date"],
+    }
+
+
+class GroupIndex:
+    def __init__(self, data_file=DATA_FILE, index_file=INDEX_FILE, precision=LOCATION_PRECISION):
+        self.data_file = data_file
+        self.index_file = index_file
+        self.offsets_file = os.path.splitext(index_file)[0] + ".offsets"
+        self.precision = precision
+        self.reset()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, "r") as f:
+                saved = json.load(f)
+        except Exception:
+            return
+        if (saved.get("version") != INDEX_VERSION or saved.get("precision") != self.precision
+                or saved.get("data_file") != self.data_file):
+            return
+        offsets_size = saved.get("offsets_size", 0)
+        if not os.path.exists(self.offsets_file) or os.path.getsize(self.offsets_file) < offsets_size:
+            # Sidecar is missing or cut short, rebuild
+            return
+        self.offset = saved.get("offset", 0)
+        self.file_id = saved.get("file_id")
+        self.groups = saved.get("groups", {})
+        self.offsets_size = offsets_size
+        self.offsets = None  # read from the sidecar on first use
+
+    def save(self):
+        with index_lock:
+            saved = {
+                "version": INDEX_VERSION,
+                "precision": self.precision,
+                "data_file": self.data_file,
+                "offset": self.offset,
+                "file_id": self.file_id,
+                "offsets_size": self.offsets_size,
+                "groups": self.groups,
+            }
+            tmp_file = self.index_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(saved, f)
+            os.replace(tmp_file, self.index_file)
+
+    def reset(self):
+        self.offset = 0
+        self.file_id = None
+        self.groups = {}
+        self.offsets_size = 0  # bytes of the sidecar that belong to this index
+        self.offsets = {}  # group id -> row offsets, None until loaded
+
+    def append_offsets(self, lines):
+        with open(self.offsets_file, "ab") as f:
+            # Drops lines an interrupted update wrote after the last save
+            f.truncate(self.offsets_size)
+            data = "".join(lines).encode("ascii")
+            f.write(data)
+        self.offsets_size += len(data)
+
+    def load_offsets(self):
+        offsets = {}
+        with open(self.offsets_file, "rb") as f:
+            for line in f.read(self.offsets_size).splitlines():
+                group_id, offset = line.split()
+                offsets.setdefault(int(group_id), []).append(int(offset))
+        return offsets
+
+    def update(self):
+        # Index only the bytes appended since the last update, rebuilds if the
+        # log was shortened or replaced
+        with index_lock:
+            start, end, file_id = new_bytes(self.data_file, self.offset, self.file_id)
+            if start != self.offset:
+                self.reset()
+            self.file_id = file_id
+            if end == self.offset:
+                return False
+            lines = []
+            for offset, row in iter_rows(self.data_file, self.offset, end):
+                key = group_key(row["isp"], row["country"], row["lat"], row["lon"], self.precision)
+                if key not in self.groups:
+                    self.groups[key] = new_group(len(self.groups))
+                group = self.groups[key]
+                add_to_group(group, row)
+                lines.append(f"{group['id']} {offset}\n")
+                if self.offsets is not None:
+                    self.offsets.setdefault(group["id"], []).append(offset)
+            self.append_offsets(lines)
+            self.offset = end
+            self.save()
+            return True
+
+    def key_for(self, row):
+        return group_key(row["isp"], row["country"], row["lat"], row["lon"], self.precision)
+
+    def summary(self, key):
+        with index_lock:
+            group = self.groups.get(key)
+            return group_summary(group) if group else None
+
+    def summaries(self):
+        # Largest groups first
+        with index_lock:
+            keys = sorted(self.groups, key=lambda k: self.groups[k]["count"], reverse=True)
+            return [(key, group_summary(self.groups[key])) for key in keys]
+
+    def rows(self, key):
+        with index_lock:
+            group = self.groups.get(key)
+            if not group:
+                return []
+            if self.offsets is None:
+                self.offsets = self.load_offsets()
+            offsets = list(self.offsets.get(group["id"], []))
+        return read_rows_at(self.data_file, offsets)
@@ -0,0 +1,134 @@
+import os
+import threading
+
+import numpy as np
+
+from data_log import DATA_FILE, iter_rows, new_bytes
+
+# ==== Hour of day x day of week aggregates ====
+# Every (weekday, hour) cell keeps a count, a sum and a histogram per metric.
+# New rows are binned with np.bincount and added to the cached arrays, so the
+# heatmap is always built from 7 x 24 cells no matter how long the history is.
+# Medians are read from the histograms (log spaced bins, about 6.5% wide).
+CACHE_FILE = "heatmap_cache.npz"
+CACHE_VERSION = 2
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+CELLS = 7 * 24
+METRICS = ["download", "upload", "ping"]
+HIST_BINS = 256
+# Bin edges: 0.01 - 100000 Mbps for speeds, 0.1 - 100000 ms for ping
+BIN_EDGES = {
+    "download": np.logspace(-2, 5, HIST_BINS + 1),
+    "upload": np.logspace(-2, 5, HIST_BINS + 1),
+    "ping": np.logspace(-1, 5, HIST_BINS + 1),
+}
+
+# ISTU updates the cache from the plot button thread while others may read it.
+# One lock for every HeatmapCache, since instances can share CACHE_FILE.
+cache_lock = threading.RLock()
+
+
+def cell_index(dates, times):
+    # Monday = 0; 1970-01-01 was a Thursday
+    days = np.array(dates, dtype="datetime64[D]").astype(np.int64)
+    weekdays = (days + 3) % 7
+    hours = np.array([int(t.split(":")[0]) for t in times], dtype=np.int64)
+    return weekdays * 24 + hours
+
+
+class HeatmapCache:
+    def __init__(self, data_file=DATA_FILE, cache_file=CACHE_FILE):
+        self.data_file = data_file
+        self.cache_file = cache_file
+        self.reset()
+        self.load()
+
+    def reset(self):
+        self.offset = 0
+        self.file_id = None
+        self.counts = np.zeros(CELLS, dtype=np.int64)
+        self.sums = {m: np.zeros(CELLS) for m in METRICS}
+        self.hists = {m: np.zeros((CELLS, HIST_BINS), dtype=np.int64) for m in METRICS}
+
+    def load(self):
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with np.load(self.cache_file) as saved:
+                if (int(saved["version"]) != CACHE_VERSION or str(saved["data_file"]) != self.data_file):
+                    return
+                self.offset = int(saved["offset"])
+                self.file_id = str(saved["file_id"]) or None
+                self.counts = saved["counts"]
+                for m in METRICS:
+                    self.sums[m] = saved[f"{m}_sum"]
+                    self.hists[m] = saved[f"{m}_hist"]
+        except Exception:
+            self.reset()
+
+    def save(self):
+        with cache_lock:
+            arrays = {f"{m}_sum": self.sums[m] for m in METRICS}
+            arrays.update({f"{m}_hist": self.hists[m] for m in METRICS})
+            tmp_file = self.cache_file + ".tmp"
+            with open(tmp_file, "wb") as f:
+                np.savez(f, version=CACHE_VERSION, data_file=self.data_file, offset=self.offset,
+                         file_id=self.file_id or "", counts=self.counts, **arrays)
+            os.replace(tmp_file, self.cache_file)
+
+    def update(self):
+        # Bins only the rows appended since the last update, rebuilds if the
+        # log was shortened or replaced
+        with cache_lock:
+            start, end, file_id = new_bytes(self.data_file, self.offset, self.file_id)
+            if start != self.offset:
+                self.reset()
+            self.file_id = file_id
+            if end == self.offset:
+                return False
+            self.add_rows(end)
+            self.offset = end
+            self.save()
+            return True
+
+    def add_rows(self, end):
+        # Adds the rows between self.offset and end to the cell aggregates
+        dates, times = [], []
+        values = {m: [] for m in METRICS}
+        for _, row in iter_rows(self.data_file, self.offset, end):
+            dates.append(row["date"])
+            times.append(row["time"])
+            for m in METRICS:
+                values[m].append(row[m])
+
+        if dates:
+            cells = cell_index(dates, times)
+            self.counts += np.bincount(cells, minlength=CELLS)
+            for m in METRICS:
+                column = np.array(values[m], dtype=float)
+                self.sums[m] += np.bincount(cells, weights=column, minlength=CELLS)
+                bins = np.clip(np.searchsorted(BIN_EDGES[m], column, side="right") - 1, 0, HIST_BINS - 1)
+                self.hists[m] += np.bincount(cells * HIST_BINS + bins, minlength=CELLS * HIST_BINS).reshape(CELLS, HIST_BINS)
+
+    def counts_grid(self):
+        with cache_lock:
+            return self.counts.reshape(7, 24).copy()
+
+    def means(self, metric):
+        # 7 x 24 grid, NaN where there are no tests
+        with cache_lock, np.errstate(invalid="ignore", divide="ignore"):
+            return (self.sums[metric] / self.counts).reshape(7, 24)
+
+    def medians(self, metric):
+        # 7 x 24 grid of the geometric centre of each cell's median bin
+        with cache_lock:
+            hist = self.hists[metric].copy()
+            counts = self.counts.copy()
+        cumulative = np.cumsum(hist, axis=1)
+        half = (counts + 1) // 2
+        median_bins = (cumulative < half[:, None]).sum(axis=1).clip(0, HIST_BINS - 1)
+        edges = BIN_EDGES[metric]
+        centres = np.sqrt(edges[:-1] * edges[1:])
+        result = centres[median_bins].astype(float)
+        result[counts == 0] = np.nan
+        return result.reshape(7, 24)
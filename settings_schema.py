@@ -0,0 +1,169 @@
+import functools
+import re
+
+import matplotlib.colors as mcolors
+
+from data_log import DATA_FILE
+
+# ==== settings.json schema ====
+# Every setting ISTU reads: (variable name in ISTU, key path in settings.json,
+# kind, default). Widget colors go to Tk and plot colors to matplotlib, which
+# accept different names ("gray20" vs "tab:gray"), so they are checked apart. validate_settings() checks a loaded settings.json against it
+# once and returns the values by variable name, so ISTU can compare two loads
+# and only apply the keys that changed.
+DEFAULT_PLOT_COLORS = ['red', 'orange', 'yellow', 'green', 'blue', 'violet']
+
+SETTINGS_SCHEMA = [
+    ("music_folder", "music_folder", "str", "sounds/music"),
+    ("history_file", "history_file", "str", DATA_FILE),
+
+    ("frame_color", "frame_color", "widget_color", "#1e1e2e"),
+    ("ISTU_text_color", "ISTU_text_color", "widget_color", "#1bcca0"),
+    ("result_text_color", "result_text_color", "widget_color", "#e0e0e0"),
+
+    ("test_button_text_color", "test_button_text_color", "widget_color", "#1debb7"),
+    ("test_button_background_color", "test_button_background_color", "widget_color", "#0d1f3b"),
+    ("test_button_click_color", "test_button_click_color", "widget_color", "#0d1f3b"),
+
+    ("plot_button_text_color", "plot_button_text_color", "widget_color", "#1debb7"),
+    ("plot_button_background_color", "plot_button_background_color", "widget_color", "#0d1f3b"),
+    ("plot_button_click_color", "plot_button_click_color", "widget_color", "#0d1f3b"),
+
+    ("action_button_background_color", "action_button_background_color", "widget_color", "#0d1f3b"),
+    ("action_button_text_color", "action_button_text_color", "widget_color", "#1debb7"),
+    ("action_button_click_color", "action_button_click_color", "widget_color", "#2563eb"),
+
+    ("auto_test_text_color", "auto_test_text_color", "widget_color", "white"),
+    ("sound_text_color", "sound_text_color", "widget_color", "white"),
+    ("music_test_text_color", "music_test_text_color", "widget_color", "white"),
+
+    ("sound_active_color", "sound_active_color", "widget_color", "#007000"),
+    ("sound_inactive_color", "sound_inactive_color", "widget_color", "#8F000A"),
+    ("music_active_color", "music_active_color", "widget_color", "#007000"),
+    ("music_inactive_color", "music_inactive_color", "widget_color", "#8F000A"),
+    ("autotest_active_color", "autotest_active_color", "widget_color", "#007000"),
+    ("autotest_inactive_color", "autotest_inactive_color", "widget_color", "#8F000A"),
+
+    ("interval_text_color", "interval_text_color", "widget_color", "black"),
+    ("interval_background_color", "interval_background_color", "widget_color", "grey"),
+
+    ("plot_colors_list", "plot_colors_list", "color_names", DEFAULT_PLOT_COLORS),
+    ("plot_background_color", "plot_background_color", "plot_color", "white"),
+    ("plot_text_color", "plot_text_color", "plot_color", "black"),
+    ("plot_border_color", "plot_border_color", "plot_color", "black"),
+
+    ("grid_enabled", "grid.enabled", "bool", True),
+    ("grid_color", "grid.color", "plot_color", "gray"),
+    ("grid_linestyle", "grid.linestyle", "str", "--"),
+    ("grid_linewidth", "grid.linewidth", "number", 0.5),
+
+    ("edge_color", "scatter.edge_color", "plot_color", "white"),
+    ("linewidth", "scatter.linewidth", "number", 1.5),
+    ("marker", "scatter.marker", "str", "o"),
+    ("size", "scatter.size", "number", 40),
+
+    ("avg_lines_settings", "average_lines", "dict", {}),
+
+    ("cbar_label", "colorbar.label", "str", "Speed (Mbps)"),
+    ("cbar_text_color", "colorbar.plot_text_color", "plot_color", "black"),
+
+    ("legend_enabled", "legend.enabled", "bool", True),
+    ("legend_text_color", "legend.text_color", "plot_color", "white"),
+    ("legend_background_color", "legend.legend_background_color", "optional_plot_color", None),
+    ("legend_ncol", "legend.ncol", "int", 2),
+    ("legend_frameon", "legend.frameon", "bool", False),
+    ("legend_border_color", "legend.legend_border_color", "plot_color", "#000000"),
+]
+
+# Color lookups are built once instead of on every load
+CSS_COLOR_NAMES = frozenset(mcolors.CSS4_COLORS)
+HEX_COLOR = re.compile(r"^#(?:[0-9a-fA-F]{3}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$")
+
+
+@functools.lru_cache(maxsize=None)
+def is_plot_color(value):
+    # Anything matplotlib draws with, e.g. "tab:gray", "C1", "0.5" or an RGB tuple
+    return mcolors.is_color_like(value)
+
+
+@functools.lru_cache(maxsize=None)
+def is_widget_color(value, resolve_color=None):
+    # Tk also knows the X11 names ("gray20", "DarkSlateGray4"). resolve_color
+    # (e.g. root.winfo_rgb) raises for anything Tk can't show; without a Tk
+    # root every non-empty name is passed on, as ISTU always did.
+    if not value.strip():
+        return False
+    if value.lower() in CSS_COLOR_NAMES or HEX_COLOR.match(value):
+        return True
+    if resolve_color is None:
+        return True
+    try:
+        resolve_color(value)
+        return True
+    except Exception:
+        return False
+
+
+def lookup(settings, key_path):
+    value = settings
+    for key in key_path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def check_value(kind, value, default, resolve_color=None):
+    # Returns the value to use, or raises ValueError
+    if kind == "widget_color":
+        if isinstance(value, str) and is_widget_color(value, resolve_color):
+            return value
+    elif kind in ("plot_color", "optional_plot_color"):
+        if value is None and kind == "optional_plot_color":
+            return value
+        # JSON gives RGB(A) colors as lists, the lookup needs them hashable
+        color = tuple(value) if isinstance(value, list) else value
+        try:
+            if isinstance(color, (str, tuple)) and is_plot_color(color):
+                return value
+        except TypeError:
+            pass
+    elif kind == "color_names":
+        # Only CSS color names are used for the speed colormap
+        if isinstance(value, list):
+            return [c for c in value if isinstance(c, str) and c in CSS_COLOR_NAMES] or list(default)
+    elif kind == "bool":
+        if isinstance(value, bool):
+            return value
+    elif kind == "int":
+        if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            return value
+    elif kind == "number":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+    elif kind == "str":
+        if isinstance(value, str):
+            return value
+    elif kind == "dict":
+        if isinstance(value, dict):
+            return value
+    raise ValueError(f"expected {kind}, got {value!r}")
+
+
+def validate_settings(settings, resolve_color=None):
+    # Returns ({variable name: value}, [error messages]). Missing keys use the
+    # default silently, invalid ones use the default and are reported.
+    # resolve_color checks widget colors against Tk, see is_widget_color().
+    values = {}
+    errors = []
+    for name, key_path, kind, default in SETTINGS_SCHEMA:
+        value = lookup(settings, key_path)
+        if value is None and kind != "optional_plot_color":
+            values[name] = default
+            continue
+        try:
+            values[name] = check_value(kind, value, default, resolve_color)
+        except ValueError as e:
+            errors.append(f"Invalid setting {key_path}: {e}")
+            values[name] = default
+    return values, errors
@@ -0,0 +1,81 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+
+# ==== Settings file watcher ====
+# changed() is cheap enough to call from a Tk after() loop. On Linux it reads
+# inotify events for the settings folder without blocking, so the file is only
+# looked at after something was written to it. Elsewhere, or if inotify is not
+# available, it compares the file's mtime and size on every call.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def open_inotify(folder):
+    # Returns a non-blocking inotify file descriptor, or None
+    if not hasattr(os, "uname") or os.uname().sysname != "Linux":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class SettingsWatcher:
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.name = os.fsencode(os.path.basename(self.path))
+        self.stamp = self.file_stamp()
+        self.fd = open_inotify(os.path.dirname(self.path))
+
+    def file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def touched(self):
+        # True if any pending inotify event is about the settings file
+        touched = False
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return touched
+            except OSError:
+                # Watch broke, fall back to polling
+                self.close()
+                return True
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                if data[offset:offset + length].rstrip(b"\0") == self.name:
+                    touched = True
+                offset += length
+
+    def changed(self):
+        if self.fd is not None and not self.touched():
+            return False
+        stamp = self.file_stamp()
+        if stamp is None or stamp == self.stamp:
+            return False
+        self.stamp = stamp
+        return True
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
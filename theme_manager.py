@@ -2,24 +2,18 @@ import os
 import shutil
 import tkinter as tk
 from tkinter import simpledialog, ttk
-import pygame
 import json
+from asset_manager import AssetManager
 
 THEMES_FOLDER = "themes"
 SETTINGS_FILE = "settings.json"
 SOUNDS_FOLDER = "sounds"
 
-# Initialize pygame mixer
-pygame.mixer.init()
+# Sounds are decoded once on first use and cached
+assets = AssetManager(SOUNDS_FOLDER)
 
 def play_sound(filename):
-    path = os.path.join(SOUNDS_FOLDER, filename)
-    if os.path.exists(path):
-        try:
-            sound = pygame.mixer.Sound(path)
-            sound.play()
-        except pygame.error:
-            pass  # silently ignore if sound can't be played
+    assets.play(filename)  # silently does nothing if sound can't be played
 
 def apply_theme(theme_filename):
     theme_path = os.path.join(THEMES_FOLDER, theme_filename)
@@ -27,13 +21,15 @@ def apply_theme(theme_filename):
         play_sound("error.wav")
         return
 
-    # Preserve current music_folder
+    # Preserve current music_folder and history_file
     current_music_folder = None
+    current_history_file = None
     if os.path.exists(SETTINGS_FILE):
         try:
             with open(SETTINGS_FILE, "r") as f:
                 current_settings = json.load(f)
                 current_music_folder = current_settings.get("music_folder")
+                current_history_file = current_settings.get("history_file")
         except Exception:
             play_sound("error.wav")
             return
@@ -49,6 +45,8 @@ def apply_theme(theme_filename):
     # Override music_folder with the preserved value
     if current_music_folder is not None:
         new_settings["music_folder"] = current_music_folder
+    if current_history_file is not None:
+        new_settings["history_file"] = current_history_file
 
     # Save merged settings to the main settings file
     try: